@@ -1,5 +1,106 @@
+import functools
+import mmap
 import re
 import os
+from contextlib import contextmanager
+from types import MappingProxyType
+
+try:
+    # Optional: pyahocorasick makes replacing original screen IDs linear in the text for large maps
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+# Lowercase hex digits; deleting them with bytes.translate leaves nothing for a valid hash.
+_HEX_DIGITS = b'0123456789abcdef'
+
+# Bytes patterns, scanned directly over the memory-mapped graph file.
+# The States header ends its line, but may follow other text on it.
+_STATES_HEADER = re.compile(rb'States \(\d+\):\r?\n')
+# The '(s:<hash>,t:<hash>):' part that follows a transition hash.
+_TRANSITION_ENDPOINTS = re.compile(rb'\s*\(s:\s*([a-f0-9]+)\s*,\s*t:\s*([a-f0-9]+)\s*\):')
+
+# A whole transition line: hash, then the optional canonical '(s:<hash>,t:<hash>):' header, then the rest.
+# '[^\S\n]' is whitespace that stays on the same line.
+_TRANSITION_LINE = re.compile(
+    rb'^[^\S\n]*([a-f0-9]{64}):'
+    rb'(?:[^\S\n]*\(s:[^\S\n]*([a-f0-9]+)[^\S\n]*,[^\S\n]*t:[^\S\n]*([a-f0-9]+)[^\S\n]*\):)?'
+    rb'(.*)$',
+    re.MULTILINE
+)
+
+_SOURCE_TARGET = re.compile(r'\(s:\s*([a-f0-9]+)\s*,\s*t:\s*([a-f0-9]+)\s*\)')
+
+# Pieces of a simplified transition, used by get_extracted_transitions.
+_SIMPLIFIED_HEADER_RE = re.compile(r'^(T\d+:\s*\(s:S\d+,t:S\d+\)):(.*)')
+_CP_RE = re.compile(r'cp=(null|\[.*?\])')
+
+# A simplified screen ID (S1, S2, ...) as a whole word.
+_SIMPLIFIED_SCREEN_ID = re.compile(r'\bS\d+\b')
+
+# Every form in which an LLM response may refer to a simplified transition ID.
+_TRANSITION_ID_FORMS = re.compile(
+    r"<\s*T?(\d+)\s*>\s*$"                                  # <1>, <T1>, <0>
+    r"|\(\s*T?(\d+)\s*\)\s*$"                               # (1), (T1), (0)
+    r"|\[\s*T?(\d+)\s*\]\s*$"                               # [1], [T1]
+    r"|[\(<\[]?\s*transition_id\s*[:=\-]\s*T?\s*(\d+)\s*[\)> \]]?\s*$"  # transition_id=23 / :T46 / -7
+    r"|\(?\s*transition\s+T?(\d+)\s*\)?\s*$"                # (transition T1), <transition T2>
+    r"|^Transition[: ]\s*T?(\d+)\s*$"                       # Transition: T11, Transition T11
+    r"|^T?(\d+)\s*$",                                       # bare T5 or t5
+    re.IGNORECASE | re.MULTILINE
+)
+# Every form above ends in a number, optionally closed by ')', '>' or ']', at the end of a line.
+# Scanning for just that is a cheap prefilter for text that cannot contain any transition ID.
+_TRANSITION_ID_CANDIDATE = re.compile(r'\d\s*[\)>\]]?\s*$', re.MULTILINE)
+
+# Reverse screen ID maps at least this large are replaced with an Aho-Corasick automaton, when available.
+_AHOCORASICK_MIN_IDS = 256
+
+# Number of graph files whose parsed maps are kept in memory by get_all_maps.
+_MAPS_CACHE_SIZE = 32
+
+
+@contextmanager
+def _mapped_graph_file(graph_path):
+    """
+    Memory-maps the graph file read-only so it can be scanned without reading it into memory.
+    Yields b'' for an empty file, which cannot be mapped.
+    """
+    fd = os.open(graph_path, os.O_RDONLY)
+    try:
+        if os.fstat(fd).st_size == 0:
+            yield b''
+            return
+        graph_map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        try:
+            yield graph_map
+        finally:
+            graph_map.close()
+    finally:
+        os.close(fd)
+
+
+def _find_line_starting_with(buffer, prefix):
+    """
+    Finds the first line of the buffer that starts with prefix, ignoring indentation.
+    Candidates are located with buffer.find, so the text in between is skipped in C
+    rather than walked by the regex engine.
+
+    Args:
+        buffer (bytes or mmap.mmap): The graph file content.
+        prefix (bytes): The text the line must start with.
+
+    Returns:
+        int: The offset of the start of that line, or -1 if there is none.
+    """
+    position = buffer.find(prefix)
+    while position != -1:
+        line_start = buffer.rfind(b'\n', 0, position) + 1
+        if not buffer[line_start:position].strip():  # Only indentation before the prefix
+            return line_start
+        position = buffer.find(prefix, position + 1)
+    return -1
 
 
 def _build_screen_id_maps(graph_path):
@@ -8,62 +109,93 @@ def _build_screen_id_maps(graph_path):
     This version assigns S1, S2, S3... IDs based on the ORDER OF APPEARANCE
     of screen definitions in the 'States' section of the graph file.
     Hashes found only in transitions will be appended at the end.
-    """
 
-    with open(graph_path, 'r', encoding='utf-8') as f:
-        full_content = f.read()  # Read the entire file content at once
+    The file is parsed in a single streaming pass. Callers should go through get_all_maps,
+    which caches the result; the returned maps are read-only views, so callers cannot
+    alter the cached entry. The public functions hand out plain dict copies of them.
 
-    # --- Step 1: Collect hashes and names from the 'States' section, preserving their order ---
+    Returns:
+        tuple: (screen_id_map, reverse_screen_id_map, unique_screen_hashes, state_blocks), where
+               state_blocks is a tuple of (hash, block text) for every screen definition block in
+               the States section, in file order, or None if the file has no States section.
+    """
+    # --- Step 1: Walk the file once, collecting States definitions and transition endpoints ---
     # This list will hold hashes in the order they are defined in the States section.
     ordered_hashes_from_states = []
+    # Set sidecar of ordered_hashes_from_states for O(1) membership checks.
+    seen_state_hashes = set()
     # This dictionary will store the screen names, linked to their hash.
     states_screen_names_map = {}
-
-    states_section_match = re.search(r'States \(\d+\):\n(.*)', full_content, re.DOTALL)
-
-    if states_section_match:
-        states_raw_text = states_section_match.group(1).strip()
-
-        # Find all starting positions of screen definitions within the states_raw_text.
-        # Each screen definition starts with a 64-character hash followed by a comma.
-        screen_start_matches = list(re.finditer(r'^[a-f0-9]{64},', states_raw_text, re.MULTILINE))
-
-        for i, match in enumerate(screen_start_matches):
-            start_pos = match.start()
-            end_pos = screen_start_matches[i + 1].start() if i + 1 < len(screen_start_matches) else len(states_raw_text)
-
-            block_content = states_raw_text[start_pos:end_pos].strip()
-
-            if not block_content:
+    # (source, target) hash pairs in the order the transitions appear in the file.
+    transition_blocks = []
+    # (hash, [raw lines]) for each multi-line screen definition block in the States section.
+    state_block_lines = None
+
+    in_states_section = False
+    with _mapped_graph_file(graph_path) as graph_map:
+        for line in iter(graph_map.readline, b'') if graph_map else ():
+            # Hash lines are a 64-character hex hash followed by ',' (state definition)
+            # or ':' (transition); checked with plain bytes operations, no regex.
+            separator = line[64:65]
+            if separator not in (b',', b':') or line[:64].translate(None, _HEX_DIGITS):
+                separator = None
+
+            if separator == b':':
+                # Transition: "<hash>: (s:<hash>,t:<hash>): [...]", counted wherever it appears
+                endpoints_match = _TRANSITION_ENDPOINTS.match(line, 65)
+                if endpoints_match:
+                    source_hash, target_hash = endpoints_match.groups()
+                    transition_blocks.append((source_hash.decode('ascii'), target_hash.decode('ascii')))
+
+            if not in_states_section:
+                # Only lines containing 'States (' can hold the header; skip the regex otherwise
+                if b'States (' in line and _STATES_HEADER.search(line):
+                    # Everything after the first States header belongs to the States section
+                    in_states_section = True
+                    state_block_lines = []
                 continue
 
-            # Extract the actual screen hash and name from the re-assembled block content.
-            # This regex is already proven to correctly parse the header for valid blocks.
-            screen_header_match = re.match(r'^[a-f0-9]{64},\s*([^,]+),', block_content)
-            if screen_header_match:
-                screen_hash = screen_header_match.group(0).split(',')[0].strip()  # Get hash reliably
-                screen_name = screen_header_match.group(1).strip()  # Get name
-
-                # Add to our ordered list ONLY if this hash hasn't been added before
-                # (e.g., if it appeared again for some reason, we take the first definition order)
-                if screen_hash not in ordered_hashes_from_states:
-                    ordered_hashes_from_states.append(screen_hash)
-                    states_screen_names_map[screen_hash] = screen_name  # Store its name
+            if separator == b',':
+                # Screen definition: "<hash>, <name>, ..." starts a new block
+                state_block_lines.append((line[:64].decode('ascii'), [line]))
+            elif state_block_lines:
+                # Continuation line of the current screen definition block
+                state_block_lines[-1][1].append(line)
+
+    state_blocks = None
+    if state_block_lines is not None:
+        # The map is read as raw bytes, so normalise CRLF line endings the way text mode did
+        state_blocks = tuple(
+            (block_hash, b''.join(lines).decode('utf-8').replace('\r\n', '\n').strip())
+            for block_hash, lines in state_block_lines
+        )
+        for block_hash, block_content in state_blocks:
+            # The name runs from the hash's comma to the next comma, which may be on a later line
+            name_end = block_content.find(',', 65)
+            if name_end <= 65:
+                continue
+            # Add to our ordered list ONLY if this hash hasn't been added before
+            # (e.g., if it appeared again for some reason, we take the first definition order)
+            if block_hash not in seen_state_hashes:
+                seen_state_hashes.add(block_hash)
+                ordered_hashes_from_states.append(block_hash)
+                states_screen_names_map[block_hash] = block_content[65:name_end].strip()  # Store its name
 
     # --- Step 2: Add any unique hashes found ONLY in transitions (that were not in States) ---
     # This ensures all screens (even those not explicitly defined in States but used in Transitions)
     # get an S ID. They will be appended at the end of the order established by the States section.
     all_unique_hashes_in_final_order = list(ordered_hashes_from_states)  # Start with order from States
+    seen_final_hashes = set(seen_state_hashes)
 
-    transition_blocks = re.findall(r'^[a-f0-9]{64}:\s*\(s:\s*([a-f0-9]+)\s*,\s*t:\s*([a-f0-9]+)\s*\):.*', full_content,
-                                   re.MULTILINE)
     for source_hash, target_hash in transition_blocks:
-        if source_hash not in all_unique_hashes_in_final_order:
+        if source_hash not in seen_final_hashes:
+            seen_final_hashes.add(source_hash)
             all_unique_hashes_in_final_order.append(source_hash)
             # If a hash is found only in transitions, its name will be None initially
             if source_hash not in states_screen_names_map:
                 states_screen_names_map[source_hash] = None
-        if target_hash not in all_unique_hashes_in_final_order:
+        if target_hash not in seen_final_hashes:
+            seen_final_hashes.add(target_hash)
             all_unique_hashes_in_final_order.append(target_hash)
             # If a hash is found only in transitions, its name will be None initially
             if target_hash not in states_screen_names_map:
@@ -85,7 +217,39 @@ def _build_screen_id_maps(graph_path):
     for h in all_unique_hashes_in_final_order:
         final_unique_screen_hashes_with_names[h] = states_screen_names_map.get(h)
 
-    return screen_id_map, reverse_screen_id_map, final_unique_screen_hashes_with_names
+    return (
+        MappingProxyType(screen_id_map),
+        MappingProxyType(reverse_screen_id_map),
+        MappingProxyType(final_unique_screen_hashes_with_names),
+        state_blocks,
+    )
+
+
+@functools.lru_cache(maxsize=_MAPS_CACHE_SIZE)
+def _cached_screen_id_maps(graph_path, mtime_ns, size):
+    # mtime_ns and size are only part of the cache key, so an edited graph file is parsed again
+    return _build_screen_id_maps(graph_path)
+
+
+def get_all_maps(graph_path):
+    """
+    Returns the screen ID maps for a graph file, parsing the file only once per process
+    for as long as it is unchanged. This is the single cached entry point used by
+    get_screens_with_information, get_transitions and get_screens.
+
+    Args:
+        graph_path (str): The path to the graph.txt file.
+
+    Returns:
+        tuple: (screen_id_map, reverse_screen_id_map, unique_screen_hashes, state_blocks),
+               as described in _build_screen_id_maps.
+    """
+    graph_stat = os.stat(graph_path)
+    return _cached_screen_id_maps(os.path.abspath(graph_path), graph_stat.st_mtime_ns, graph_stat.st_size)
+
+
+# Same interface as functools.lru_cache, e.g. to start tests from an empty cache
+get_all_maps.cache_clear = _cached_screen_id_maps.cache_clear
 
 
 def get_screens_with_information(graph_path):
@@ -101,121 +265,132 @@ def get_screens_with_information(graph_path):
         list: A list of strings, where each string is a full logical screen detail block
               with the original hash ID replaced by its simplified ID.
     """
-    screen_id_map, reverse_screen_id_map, _ = _build_screen_id_maps(graph_path)
+    screen_id_map, reverse_screen_id_map, _, state_blocks = get_all_maps(graph_path)
 
     full_screen_logical_blocks = []
 
-    try:
-        with open(graph_path, 'r', encoding='utf-8') as f:
-            full_content = f.read()
-    except FileNotFoundError:
-        print(f"Error: Graph file not found at {graph_path}")
-        return []
-
-    states_section_match = re.search(r'States \(\d+\):\n(.*)', full_content, re.DOTALL)
-
-    if states_section_match:
-        states_raw_text = states_section_match.group(1).strip()
-
-        screen_start_matches = list(re.finditer(r'^[a-f0-9]{64},', states_raw_text, re.MULTILINE))
-
-        if not screen_start_matches:
+    if state_blocks is not None:
+        if not state_blocks:
             print(f"Warning: No valid screen definitions found in States section of {graph_path}.")
-            # Even if no matches, return an empty list, don't try to sort.
+            # Even if no matches, return an empty list.
             return []
 
-        for i, match in enumerate(screen_start_matches):
-            start_pos = match.start()
-            end_pos = screen_start_matches[i + 1].start() if i + 1 < len(screen_start_matches) else len(states_raw_text)
-
-            block_content = states_raw_text[start_pos:end_pos].strip()
-
-            if not block_content:
-                continue
-
-            original_hash_match = re.match(r'^[a-f0-9]{64}', block_content)
-            if original_hash_match:
-                original_hash = original_hash_match.group(0)
-                simplified_id = reverse_screen_id_map.get(original_hash)
+        # The blocks were already split out of the States section by get_all_maps.
+        # They are in definition order, which is the order S IDs were assigned in, so the
+        # output is already sorted by S ID.
+        for original_hash, block_content in state_blocks:
+            simplified_id = reverse_screen_id_map.get(original_hash)
 
-                if simplified_id:
-                    modified_block = re.sub(r'^[a-f0-9]{64}', simplified_id, block_content, 1)
-                    full_screen_logical_blocks.append(modified_block)
-                else:
-                    print(
-                        f"Warning: Hash '{original_hash}' from block '{block_content[:50]}...' not found in screen ID map. Skipping this block from output.")
+            if simplified_id:
+                modified_block = simplified_id + block_content[len(original_hash):]
+                full_screen_logical_blocks.append(modified_block)
             else:
                 print(
-                    f"Error: Logical block identified by start match but doesn't start with hash: '{block_content[:50]}...' Skipping this block.")
+                    f"Warning: Hash '{original_hash}' from block '{block_content[:50]}...' not found in screen ID map. Skipping this block from output.")
+
+    # Plain dict copies, so callers can modify or serialise them without touching the cached maps
+    return full_screen_logical_blocks, dict(screen_id_map), dict(reverse_screen_id_map)
 
-    # # --- CRITICAL DEBUGGING STEP ---
-    # print(f"\n--- Debugging {os.path.basename(graph_path)}: Content of full_screen_logical_blocks before sorting ---")
-    # if not full_screen_logical_blocks:
-    #     print("  (List is empty)")
-    # else:
-    #     for i, item in enumerate(full_screen_logical_blocks):
-    #         # Print item with its index for easier identification
-    #         print(f"  [{i}]: '{item}'")
-    # print("-------------------------------------------------------------------\n")
 
-    # === IMPERVIOUS SORT KEY ===
-    # This key will assign an integer for valid S# lines, and a very high number (float('inf'))
-    # for any line that does not match the "S#:" format, pushing them to the end without crashing.
-    full_screen_logical_blocks.sort(key=lambda x: int(x.split(':', 1)[0][1:])
-    if re.match(r'^S\d+:', x) else float('inf'))
+def iter_transitions(graph_path, transition_id_map=None, reverse_transition_id_map=None):
+    """
+    Lazily yields the transitions of the graph file as simplified strings, one at a time,
+    without building the whole list in memory.
+
+    Args:
+        graph_path (str): The path to the graph.txt file.
+        transition_id_map (dict, optional): Filled with simplified ID (T#) -> original hash
+                                            as transitions are yielded.
+        reverse_transition_id_map (dict, optional): Filled with original hash -> simplified ID (T#)
+                                                    as transitions are yielded.
 
-    return full_screen_logical_blocks, screen_id_map, reverse_screen_id_map
+    Yields:
+        str: A transition in the format "T#: (s:S#,t:S#): [...] weight=...".
+    """
+    _, reverse_screen_id_map, _, _ = get_all_maps(graph_path)
+
+    if transition_id_map is None:
+        transition_id_map = {}
+    if reverse_transition_id_map is None:
+        reverse_transition_id_map = {}
+    transition_counter = len(reverse_transition_id_map) + 1
+
+    with _mapped_graph_file(graph_path) as graph_map:
+        # The Transitions section runs from the first "Transitions" line to the next "States" line
+        transitions_start = _find_line_starting_with(graph_map, b'Transitions')
+        states_start = _find_line_starting_with(graph_map, b'States')
+        if transitions_start == -1 or -1 < states_start < transitions_start:
+            transition_matches = ()
+        else:
+            section_end = states_start if states_start != -1 else len(graph_map)
+            # The header line itself can never match a transition line, so it is scanned too
+            transition_matches = _TRANSITION_LINE.finditer(graph_map, transitions_start, section_end)
+
+        # Bind the lookup used on every transition to a local for the hot loop
+        get_screen_id = reverse_screen_id_map.get
+
+        try:
+            for transition_match in transition_matches:
+                transition_hash = transition_match.group(1).decode('ascii')
+
+                if transition_match.group(2) is not None:
+                    # Canonical "(s:<hash>,t:<hash>): ..." layout, parsed by the regex in one go
+                    source_hash = transition_match.group(2).decode('ascii')
+                    target_hash = transition_match.group(3).decode('ascii')
+                    remaining = transition_match.group(4).decode('utf-8').strip()
+                else:
+                    # Irregular layout: look for the source/target anywhere and keep the whole line
+                    s_match = _SOURCE_TARGET.search(transition_match.group(4).decode('utf-8'))
+                    if not s_match:
+                        continue
+                    source_hash, target_hash = s_match.groups()
+                    remaining = transition_match.group(0).decode('utf-8').strip()
+
+                tid = reverse_transition_id_map.get(transition_hash)
+                if tid is None:
+                    tid = f"T{transition_counter}"
+                    reverse_transition_id_map[transition_hash] = tid
+                    transition_id_map[tid] = transition_hash
+                    transition_counter += 1
+
+                # Use already assigned sorted S IDs
+                simplified_source_id = get_screen_id(source_hash, source_hash)
+                simplified_target_id = get_screen_id(target_hash, target_hash)
+
+                yield f"{tid}: (s:{simplified_source_id},t:{simplified_target_id}): {remaining}"
+        finally:
+            # The match iterator holds a buffer export on the mapping, which must be released
+            # before the mapping can be closed (e.g. when the caller stops iterating early)
+            transition_matches = transition_match = None
 
 
 def get_transitions(graph_path):
-    screen_id_map, reverse_screen_id_map, _ = _build_screen_id_maps(graph_path)
+    screen_id_map, reverse_screen_id_map, _, _ = get_all_maps(graph_path)
 
     transition_id_map = {}
     reverse_transition_id_map = {}
-    simplified_transitions = []
-    transition_counter = 1
-
-    with open(graph_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
-    inside_transition_block = False
-    for line in lines:
-        line = line.strip()
-        if line.startswith("Transitions"):
-            inside_transition_block = True
-            continue
-        if line.startswith("States"):
-            break
-
-        if inside_transition_block and re.match(r'^[a-f0-9]{64}:', line):
-            parts = line.split(":", 1)
-            if len(parts) != 2:
-                continue
-
-            transition_hash = parts[0].strip()
-
-            s_match = re.search(r'\(s:\s*([a-f0-9]+)\s*,\s*t:\s*([a-f0-9]+)\s*\)', parts[1])
-            if not s_match:
-                continue
+    simplified_transitions = list(iter_transitions(graph_path, transition_id_map, reverse_transition_id_map))
 
-            source_hash = s_match.group(1)
-            target_hash = s_match.group(2)
+    # Plain dict copies, so callers can modify or serialise them without touching the cached maps
+    return (simplified_transitions, transition_id_map, reverse_transition_id_map,
+            dict(screen_id_map), dict(reverse_screen_id_map))
 
-            if transition_hash not in reverse_transition_id_map:
-                tid = f"T{transition_counter}"
-                reverse_transition_id_map[transition_hash] = tid
-                transition_id_map[tid] = transition_hash
-                transition_counter += 1
 
-            # Use already assigned sorted S IDs
-            simplified_source_id = reverse_screen_id_map.get(source_hash, source_hash)
-            simplified_target_id = reverse_screen_id_map.get(target_hash, target_hash)
+def iter_clean_transitions(transitions):
+    """
+    Lazily cleans transition strings one at a time; see clean_transitions.
 
-            remaining = re.sub(r'^[a-f0-9]{64}:\s*\(s:\s*[a-f0-9]+\s*,\s*t:\s*[a-f0-9]+\s*\):', '', line).strip()
-            new_line = f"{reverse_transition_id_map[transition_hash]}: (s:{simplified_source_id},t:{simplified_target_id}): {remaining}"
-            simplified_transitions.append(new_line)
+    Args:
+        transitions (iterable): Transition strings, e.g. from iter_transitions.
 
-    return simplified_transitions, transition_id_map, reverse_transition_id_map, screen_id_map, reverse_screen_id_map
+    Yields:
+        str: Each transition string with everything from "weight=" onwards removed.
+    """
+    for transition_str in transitions:
+        # Cut the string at the first 'weight=' (a plain substring search, no regex needed)
+        weight_start = transition_str.find('weight=')
+        cleaned_str = transition_str[:weight_start] if weight_start != -1 else transition_str
+        yield cleaned_str.strip()  # .strip() to remove any leftover whitespace
 
 
 def clean_transitions(transitions_list):
@@ -230,40 +405,24 @@ def clean_transitions(transitions_list):
     Returns:
         list: A new list of cleaned transition strings.
     """
-    cleaned_list = []
-    # Regex to match ' weight=' and everything that follows it (non-greedy .*?)
-    # and then greedy .* to match till the end of the line.
-    # The '?' after .* makes the matching non-greedy for the text before 'weight=',
-    # ensuring we cut exactly from the *first* occurrence of ' weight='.
-    # Actually, a simpler regex `r' weight=.*'` should work perfectly because we want
-    # to remove everything *after* ' weight='.
-    pattern = re.compile(r'\s*weight=.*')
-
-    for transition_str in transitions_list:
-        # Substitute the matched pattern with an empty string
-        cleaned_str = pattern.sub('', transition_str)
-        cleaned_list.append(cleaned_str.strip()) # .strip() to remove any leftover whitespace
-
-    return cleaned_list
+    return list(iter_clean_transitions(transitions_list))
 
 
 def get_screens(graph_path):
-    screen_id_map, reverse_screen_id_map, unique_screen_hashes = _build_screen_id_maps(graph_path)
+    screen_id_map, reverse_screen_id_map, unique_screen_hashes, _ = get_all_maps(graph_path)
 
     screen_names_output = []
 
-    # Create a list of (numerical_id, formatted_string) for sorting
+    # unique_screen_hashes is in the order S IDs were assigned (S1, S2, S3...),
+    # so the lines come out already sorted
     for screen_hash, screen_name_from_states in unique_screen_hashes.items():
         simplified_id = reverse_screen_id_map.get(screen_hash)
         if simplified_id:
             # Use the name found in the states block, or fallback if not found
             display_name = screen_name_from_states if screen_name_from_states is not None else "Unknown Screen"
-            screen_names_output.append((int(simplified_id[1:]), f"{simplified_id}: {display_name}"))
+            screen_names_output.append(f"{simplified_id}: {display_name}")
 
-    # Sort by the numerical part of the simplified ID (S1, S2, S3...)
-    screen_names_output.sort(key=lambda x: x[0])
-
-    return "\n".join([item[1] for item in screen_names_output])
+    return "\n".join(screen_names_output)
 
 
 # def get_original_transition_ids(response_text, transition_id_map):
@@ -353,6 +512,11 @@ def get_original_transition_ids(text, transition_id_map):
     - Bare T5 / t5 at end of line
     """
 
+    # Stage 1: without a number at the end of some line, none of the forms can match
+    if not _TRANSITION_ID_CANDIDATE.search(text):
+        return text
+
+    # Stage 2: full replacement pass
     # Normalize mapping keys to uppercase (T# form)
     normalized_map = {k.strip().upper(): v for k, v in transition_id_map.items()}
 
@@ -369,40 +533,25 @@ def get_original_transition_ids(text, transition_id_map):
         original_id = normalized_map.get(tid, tid)
         return f"<{original_id}>"
 
-    pattern = re.compile(
-        r"<\s*T?(\d+)\s*>\s*$"                                  # <1>, <T1>, <0>
-        r"|\(\s*T?(\d+)\s*\)\s*$"                               # (1), (T1), (0)
-        r"|\[\s*T?(\d+)\s*\]\s*$"                               # [1], [T1]
-        r"|[\(<\[]?\s*transition_id\s*[:=\-]\s*T?\s*(\d+)\s*[\)> \]]?\s*$"  # transition_id=23 / :T46 / -7
-        r"|\(?\s*transition\s+T?(\d+)\s*\)?\s*$"                # (transition T1), <transition T2>
-        r"|^Transition[: ]\s*T?(\d+)\s*$"                       # Transition: T11, Transition T11
-        r"|^T?(\d+)\s*$",                                       # bare T5 or t5
-        re.IGNORECASE | re.MULTILINE
-    )
-
-    return pattern.sub(replacer, text)
+    return _TRANSITION_ID_FORMS.sub(replacer, text)
 
 
-def get_extracted_transitions(simplified_transitions):
+def iter_extracted_transitions(simplified_transitions):
     """
-    Parses a list of simplified transition strings and extracts important information,
-    formatting it into a cleaner, more readable representation.
+    Lazily parses simplified transition strings one at a time; see get_extracted_transitions.
+    Allows a pipeline such as iter_extracted_transitions(iter_transitions(graph_path)) to handle
+    one transition end to end at a time.
 
     Args:
-        simplified_transitions (list): A list of strings, where each string is
-                                       a simplified transition in the format:
-                                       "T_id: (s:S_id,t:S_id): [id=..., act=(...) click, cp=[...], ...]"
+        simplified_transitions (iterable): Simplified transition strings, e.g. from iter_transitions.
 
-    Returns:
-        list: A list of newly formatted strings with extracted details.
-              Example: "T3: (s:S3,t:S4): Action = click; Component = [Type = Button, Identifier = permission_allow_button, Text = Allow, Description = ""]"
+    Yields:
+        str: A formatted string with the extracted details of each well-formed transition.
     """
-    formatted_transitions = []
-
     for transition_str in simplified_transitions:
         # 1. Extract the initial part: T_id: (s:S_id,t:S_id):
         # This regex captures the 'T#: (s:S#,t:S#):' part and the rest of the string
-        header_match = re.match(r'^(T\d+:\s*\(s:S\d+,t:S\d+\)):(.*)', transition_str)
+        header_match = _SIMPLIFIED_HEADER_RE.match(transition_str)
         if not header_match:
             # Skip lines that don't match the expected header format
             continue
@@ -418,14 +567,17 @@ def get_extracted_transitions(simplified_transitions):
         comp_description = ""
 
         # 2. Extract Action (act)
-        # Looks for 'act=(digit) ' followed by the action text (non-greedy, stopping at comma or end)
-        action_match = re.search(r'act=\(\d+\)\s*([^,\]]+)', details_part)
-        if action_match:
-            action = action_match.group(1).strip()
+        # Looks for 'act=(digit) ' followed by the action text (stopping at comma, ']' or end)
+        action_start = details_part.find('act=(')
+        if action_start != -1:
+            action_code_end = details_part.find(')', action_start + 5)
+            if action_code_end != -1 and details_part[action_start + 5:action_code_end].isdigit():
+                action_text = details_part[action_code_end + 1:].split(',', 1)[0].split(']', 1)[0]
+                action = action_text.strip()
 
         # 3. Extract Component (cp) and its sub-attributes
         # First, find the 'cp=' part. It can be 'cp=null' or 'cp=[...]'
-        component_value_match = re.search(r'cp=(null|\[.*?\])', details_part)
+        component_value_match = _CP_RE.search(details_part)
 
         component_details_string = ""
         if component_value_match:
@@ -436,28 +588,21 @@ def get_extracted_transitions(simplified_transitions):
             # If raw_cp_value is 'null', component_details_string remains empty, which is desired
 
         if component_details_string:
-            # Now parse the content within the component_details_string for specific attributes
-
-            # Type (ty)
-            type_match = re.search(r'ty=([^,\]]+)', component_details_string)
-            if type_match:
-                comp_type = type_match.group(1).strip()
-
-            # Identifier (idx)
-            identifier_match = re.search(r'idx=([^,\]]+)', component_details_string)
-            if identifier_match:
-                comp_identifier = identifier_match.group(1).strip()
-
-            # Text (tx) - often within the component payload
-            text_match = re.search(r'tx=([^,\]]+)', component_details_string)
-            if text_match:
-                comp_text = text_match.group(1).strip()
-
-            # Description (dsc) - often at the end, so it might not be followed by a comma
-            # Using [^\]]* to allow empty description and match till the end of the component string
-            description_match = re.search(r'dsc=([^\]]*)', component_details_string)
-            if description_match:
-                comp_description = description_match.group(1).strip()
+            # Now parse the content within the component_details_string for specific attributes.
+            # Description (dsc) is at the end and may itself contain commas, so it is split off first
+            # and runs to the end of the component string.
+            attributes_part, _, description_part = component_details_string.partition('dsc=')
+            comp_description = description_part.strip()
+
+            # The remaining 'key=value' attributes are comma separated; the first occurrence of a key wins
+            component_fields = {}
+            for attribute in attributes_part.split(','):
+                key, _, value = attribute.partition('=')
+                component_fields.setdefault(key.strip(), value.strip())
+
+            comp_type = component_fields.get('ty', "")  # Type (ty)
+            comp_identifier = component_fields.get('idx', "")  # Identifier (idx)
+            comp_text = component_fields.get('tx', "")  # Text (tx)
 
         # 4. Format the extracted information into the desired output string
         formatted_line = (
@@ -465,9 +610,24 @@ def get_extracted_transitions(simplified_transitions):
             f"Component = [Type = \"{comp_type}\", Identifier = \"{comp_identifier}\", "
             f"Text = \"{comp_text}\", Description = \"{comp_description}\"]"
         )
-        formatted_transitions.append(formatted_line)
+        yield formatted_line
+
 
-    return formatted_transitions
+def get_extracted_transitions(simplified_transitions):
+    """
+    Parses a list of simplified transition strings and extracts important information,
+    formatting it into a cleaner, more readable representation.
+
+    Args:
+        simplified_transitions (list): A list of strings, where each string is
+                                       a simplified transition in the format:
+                                       "T_id: (s:S_id,t:S_id): [id=..., act=(...) click, cp=[...], ...]"
+
+    Returns:
+        list: A list of newly formatted strings with extracted details.
+              Example: "T3: (s:S3,t:S4): Action = click; Component = [Type = Button, Identifier = permission_allow_button, Text = Allow, Description = ""]"
+    """
+    return list(iter_extracted_transitions(simplified_transitions))
 
 
 def replace_simplified_screen_ids_with_original_ids(screen_descriptions_text, screen_id_map):
@@ -484,22 +644,16 @@ def replace_simplified_screen_ids_with_original_ids(screen_descriptions_text, sc
     Returns:
         str: The modified text with simplified screen IDs replaced by original IDs.
     """
-    # To prevent issues where "S1" in "S10" is replaced first,
-    # sort the simplified IDs in descending order of their numerical part.
-    # This ensures "S10" is processed before "S1", "S11" before "S1", etc.
-    # The keys of screen_id_map are already in the "S#" format.
-    sorted_s_ids = sorted(screen_id_map.keys(), key=lambda s_id: int(s_id[1:]), reverse=True)
-
-    modified_text = screen_descriptions_text
-    for s_id in sorted_s_ids:
+    def replacer(match):
+        s_id = match.group(0)
         original_id = screen_id_map.get(s_id)
-        if original_id is not None:  # Use is not None to handle cases where original_id might be 0
-            # Use word boundaries (\b) to ensure we replace only the full S ID.
-            # re.escape() is used in case s_id contains characters special to regex (though "S#" is usually safe).
-            pattern = r'\b' + re.escape(s_id) + r'\b'
-            modified_text = re.sub(pattern, str(original_id), modified_text)
+        if original_id is None:  # Use is None to handle cases where original_id might be 0
+            return s_id
+        return str(original_id)
 
-    return modified_text
+    # One pass over the text: every full S# token (word boundaries on both sides, so "S1"
+    # never matches inside "S10") is looked up in the map.
+    return _SIMPLIFIED_SCREEN_ID.sub(replacer, screen_descriptions_text)
 
 
 def replace_original_screen_ids_with_simplified_ids(text_content, reverse_screen_id_map):
@@ -514,19 +668,73 @@ def replace_original_screen_ids_with_simplified_ids(text_content, reverse_screen
     Returns:
         str: The modified text with original screen IDs replaced by simplified S# IDs.
     """
-    modified_text = text_content
+    if not reverse_screen_id_map:
+        return text_content
+
+    if ahocorasick is not None and len(reverse_screen_id_map) >= _AHOCORASICK_MIN_IDS:
+        return _replace_ids_with_automaton(text_content, reverse_screen_id_map)
 
-    # We only need to iterate through the screen ID map
-    # Sort original screen IDs by length in descending order to avoid partial replacements.
+    # Sort original screen IDs by length in descending order to avoid partial replacements;
+    # the alternation tries them in this order at each position.
     sorted_original_screen_ids = sorted(reverse_screen_id_map.keys(), key=lambda x: (len(x), x), reverse=True)
 
-    for original_id in sorted_original_screen_ids:
-        simplified_id = reverse_screen_id_map[original_id]
+    # Use word boundaries (\b) and re.escape() for robust replacement, all IDs in a single pass.
+    pattern = re.compile(r'\b(?:' + '|'.join(map(re.escape, sorted_original_screen_ids)) + r')\b')
+
+    return pattern.sub(lambda match: reverse_screen_id_map[match.group(0)], text_content)
+
+
+def _is_word_char(char):
+    # Same definition of a word character as the regex \w
+    return char.isalnum() or char == '_'
+
+
+def _is_word_boundary(text, index):
+    # Same as the regex \b: exactly one side of the position is a word character
+    before = index > 0 and _is_word_char(text[index - 1])
+    after = index < len(text) and _is_word_char(text[index])
+    return before != after
 
-        # Use word boundaries (\b) and re.escape() for robust replacement.
-        pattern = r'\b' + re.escape(original_id) + r'\b'
 
-        # Perform the replacement.
-        modified_text = re.sub(pattern, simplified_id, modified_text)
+def _replace_ids_with_automaton(text_content, id_map):
+    """
+    Replaces every whole-word occurrence of an id_map key in the text with its value, finding all
+    keys in a single pass with an Aho-Corasick automaton. Gives the same result as the word-bounded,
+    longest-first alternation in replace_original_screen_ids_with_simplified_ids.
+
+    Args:
+        text_content (str): The input text.
+        id_map (dict): Maps the IDs to look for to their replacements.
+
+    Returns:
+        str: The text with the IDs replaced.
+    """
+    automaton = ahocorasick.Automaton()
+    for original_id in id_map:
+        if original_id:
+            automaton.add_word(original_id, len(original_id))
+    automaton.make_automaton()
+
+    # Collect the (start, -end) of every occurrence with a word boundary on both sides
+    occurrences = []
+    for end_index, id_length in automaton.iter(text_content):
+        end = end_index + 1
+        start = end - id_length
+        if _is_word_boundary(text_content, start) and _is_word_boundary(text_content, end):
+            occurrences.append((start, -end))
+
+    # Leftmost first, and the longest ID at the same position; overlapping occurrences are skipped
+    occurrences.sort()
+
+    pieces = []
+    position = 0
+    for start, negative_end in occurrences:
+        if start < position:
+            continue
+        end = -negative_end
+        pieces.append(text_content[position:start])
+        pieces.append(id_map[text_content[start:end]])
+        position = end
+    pieces.append(text_content[position:])
 
-    return modified_text
+    return ''.join(pieces)